@@ -1,12 +1,30 @@
 import os
+import logging
+from functools import lru_cache
+
+# Let the BLAS/OpenMP pools use every core unless the deployment says
+# otherwise; must be set before torch is imported
+os.environ.setdefault("OMP_NUM_THREADS", str(os.cpu_count()))
+os.environ.setdefault("MKL_NUM_THREADS", str(os.cpu_count()))
+
+import numpy as np
 import torch
-import torch.nn.functional as F
 from transformers import AutoTokenizer, AutoModel
 from api.logging_utils import setup_logger
 
 # Set up logger
 logger = setup_logger(__name__)
 
+# Allow TF32 matmul on Ampere+ GPUs
+torch.set_float32_matmul_precision("high")
+
+# Reduced-precision dtypes selectable via EMBED_DTYPE for GPU inference
+_DTYPES = {
+    "float16": torch.float16,
+    "bfloat16": torch.bfloat16,
+    "float32": None
+}
+
 class EmbeddingModel:
     def __init__(self):
         try:
@@ -18,15 +36,82 @@ class EmbeddingModel:
                 raise FileNotFoundError(f"Model directory {self.model_dir} not found")
             
             logger.info(f"Loading tokenizer from {self.model_dir}")
-            self.tokenizer = AutoTokenizer.from_pretrained(self.model_dir)
+            # Fast Rust tokenizer with a fixed truncation length keeps batch
+            # shapes bounded (and torch.compile's recompile cache effective)
+            self.tokenizer = AutoTokenizer.from_pretrained(
+                self.model_dir,
+                use_fast=True,
+                model_max_length=int(os.getenv("EMBED_MAX_LENGTH", "128"))
+            )
+            if not self.tokenizer.is_fast:
+                logger.warning("Fast tokenizer unavailable, using the slow Python tokenizer")
             
             logger.info(f"Loading model from {self.model_dir}")
-            self.model = AutoModel.from_pretrained(self.model_dir)
-            
+            try:
+                # Prefer fused scaled-dot-product attention kernels;
+                # use_safetensors guarantees the mmap-friendly weights file
+                # is loaded rather than the pickled .bin
+                self.model = AutoModel.from_pretrained(self.model_dir, attn_implementation="sdpa", use_safetensors=True)
+            except (TypeError, ValueError) as e:
+                logger.warning(f"SDPA attention not available, falling back to default: {str(e)}")
+                self.model = AutoModel.from_pretrained(self.model_dir, use_safetensors=True)
+            self.model.eval()
+            self.embedding_dim = self.model.config.hidden_size
+
             self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
             logger.info(f"Using device: {self.device}")
-            
+
+            # CPU encoding is GEMM-bound and torch's defaults are often
+            # conservative under uvicorn. Override with TORCH_NUM_THREADS
+            # when running multiple workers so threads x workers does not
+            # oversubscribe the cores
+            if self.device.type == "cpu":
+                torch.set_num_threads(int(os.getenv("TORCH_NUM_THREADS", os.cpu_count())))
+                try:
+                    torch.set_num_interop_threads(2)
+                except RuntimeError:
+                    # Already fixed once parallel work has started
+                    pass
+                logger.info(f"Using {torch.get_num_threads()} intra-op threads for CPU encoding")
+
             self.model.to(self.device)
+
+            # Run the forward in FP16/BF16 on GPU (EMBED_DTYPE selects the
+            # dtype); pooling and normalization stay in FP32
+            self.autocast_dtype = None
+            if self.device.type == "cuda":
+                self.autocast_dtype = _DTYPES.get(os.getenv("EMBED_DTYPE", "float16"))
+                if self.autocast_dtype is not None:
+                    logger.info(f"Using {self.autocast_dtype} for GPU inference")
+                    self.model = self.model.to(self.autocast_dtype)
+
+            # Dynamically quantize Linear layers to INT8 for CPU inference
+            # (LayerNorm/Softmax/GELU stay FP32); opt out with EMBED_QUANT=off
+            if self.device.type == "cpu" and os.getenv("EMBED_QUANT", "int8") == "int8":
+                logger.info("Applying dynamic INT8 quantization for CPU inference")
+                self.model = torch.quantization.quantize_dynamic(
+                    self.model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+
+            # Compile the model to fuse attention/LayerNorm/bias-add kernels;
+            # opt out with EMBED_COMPILE=0 (e.g. where inductor is unavailable).
+            # torch.compile defers failures to the first forward, so warm up
+            # here and restore the eager model if the compiled one cannot run
+            if os.getenv("EMBED_COMPILE", "1") == "1" and hasattr(torch, "compile"):
+                eager_model = self.model
+                logger.info("Compiling model with torch.compile")
+                self.model = torch.compile(self.model, mode="reduce-overhead", dynamic=True)
+                try:
+                    self.encode(["warmup"])
+                except Exception as e:
+                    logger.warning(f"Compiled model failed on warmup, using eager model: {str(e)}")
+                    self.model = eager_model
+                    self.encode(["warmup"])
+            else:
+                # Warm up so kernel selection happens at startup, not on the
+                # first request
+                self.encode(["warmup"])
+
             logger.info("Embedding model initialized successfully")
         except Exception as e:
             logger.error(f"Error initializing embedding model: {str(e)}")
@@ -38,45 +123,67 @@ class EmbeddingModel:
         """
         try:
             token_embeddings = model_output[0]  # First element of model_output contains all token embeddings
-            input_mask_expanded = attention_mask.unsqueeze(-1).expand(token_embeddings.size()).float()
-            return torch.sum(token_embeddings * input_mask_expanded, 1) / torch.clamp(input_mask_expanded.sum(1), min=1e-9)
+            # Broadcasting a (B, L, 1) mask avoids materializing the
+            # (B, L, dim) expanded copy
+            mask = attention_mask.unsqueeze(-1).to(token_embeddings.dtype)
+            summed = (token_embeddings * mask).sum(dim=1)
+            counts = mask.sum(dim=1).clamp_min(1e-9)
+            return summed / counts
         except Exception as e:
             logger.error(f"Error in mean pooling: {str(e)}")
             raise
     
     def encode(self, sentences, batch_size=32):
         """
-        Generate embeddings for a list of sentences
+        Generate embeddings for a list of sentences as a (N, dim) float32 array
         """
         if not sentences:
             logger.warning("Empty list of sentences provided for encoding")
-            return []
-        
+            return np.empty((0, self.embedding_dim), dtype=np.float32)
+
         logger.info(f"Encoding {len(sentences)} sentences with batch size {batch_size}")
-        all_embeddings = []
-        
+        all_embeddings = np.empty((len(sentences), self.embedding_dim), dtype=np.float32)
+
         try:
-            # Process sentences in batches
-            for i in range(0, len(sentences), batch_size):
-                batch = sentences[i:i+batch_size]
-                logger.debug(f"Processing batch {i//batch_size + 1}/{(len(sentences)-1)//batch_size + 1}")
-                
+            # Sort sentences by token length so each batch pads to a similar
+            # length instead of wasting FLOPs on padding to the longest one
+            lengths = [len(ids) for ids in self.tokenizer(list(sentences), truncation=True)["input_ids"]]
+            order = np.argsort(lengths, kind="stable")
+
+            # Process sentences in length-bucketed batches
+            for i in range(0, len(order), batch_size):
+                bucket = order[i:i+batch_size]
+                batch = [sentences[j] for j in bucket]
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"Processing batch {i//batch_size + 1}/{(len(sentences)-1)//batch_size + 1}")
+
                 # Tokenize sentences
                 encoded_input = self.tokenizer(batch, padding=True, truncation=True, return_tensors='pt')
-                encoded_input = {k: v.to(self.device) for k, v in encoded_input.items()}
+                if self.device.type == "cuda":
+                    # Pinned source memory makes the host-to-device copy
+                    # asynchronous so it overlaps with GPU compute
+                    encoded_input = {k: v.pin_memory().to(self.device, non_blocking=True) for k, v in encoded_input.items()}
+                else:
+                    encoded_input = {k: v.to(self.device) for k, v in encoded_input.items()}
                 
                 # Compute token embeddings
-                with torch.no_grad():
-                    model_output = self.model(**encoded_input)
-                
-                # Perform pooling
-                sentence_embeddings = self._mean_pooling(model_output, encoded_input['attention_mask'])
-                
-                # Normalize embeddings
-                sentence_embeddings = F.normalize(sentence_embeddings, p=2, dim=1)
-                
-                # Convert to list and add to results
-                all_embeddings.extend(sentence_embeddings.cpu().numpy().tolist())
+                with torch.inference_mode():
+                    if self.autocast_dtype is not None:
+                        with torch.autocast("cuda", dtype=self.autocast_dtype):
+                            model_output = self.model(**encoded_input)
+                    else:
+                        model_output = self.model(**encoded_input)
+
+                    # Perform pooling (back in FP32 for a stable normalize)
+                    sentence_embeddings = self._mean_pooling(model_output, encoded_input['attention_mask']).float()
+
+                    # Normalize embeddings in place to skip an intermediate
+                    sentence_embeddings = sentence_embeddings.div_(
+                        sentence_embeddings.norm(p=2, dim=1, keepdim=True).clamp_min(1e-12)
+                    )
+
+                # Place the rows back in the original order in one bulk copy
+                all_embeddings[bucket] = sentence_embeddings.cpu().numpy()
             
             logger.info(f"Successfully encoded {len(sentences)} sentences")
             return all_embeddings
@@ -99,4 +206,13 @@ def get_embedding_model():
         return embedding_model
     except Exception as e:
         logger.error(f"Error getting embedding model: {str(e)}")
-        raise 
\ No newline at end of file
+        raise
+
+@lru_cache(maxsize=4096)
+def encode_one_cached(text):
+    """
+    Encode a single text, caching the resulting vector by exact text
+    so repeated queries skip the model forward pass entirely
+    """
+    model = get_embedding_model()
+    return np.asarray(model.encode([text])[0], dtype=np.float32)
\ No newline at end of file
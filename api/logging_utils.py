@@ -1,37 +1,52 @@
+import atexit
 import logging
+import logging.handlers
 import os
 import sys
 from datetime import datetime
+from queue import SimpleQueue
 
 # Create logs directory if it doesn't exist
 os.makedirs("logs", exist_ok=True)
 
-# Configure logging
-def setup_logger(name):
+# Started on first use; all loggers feed one queue so request handlers
+# never block on file I/O or contend on handler locks
+_queue_listener = None
+
+def _configure_logging():
     """
-    Set up a logger with file and console handlers
+    One-time root logger setup: a QueueHandler on the root logger feeds a
+    background QueueListener that owns the rotating file and console handlers
     """
-    # Create logger
-    logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
-    
-    # Create formatter
+    global _queue_listener
+    if _queue_listener is not None:
+        return
+
     formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    
-    # Create file handler that logs all messages
+
     log_filename = f"logs/{datetime.now().strftime('%Y-%m-%d')}.log"
-    file_handler = logging.FileHandler(log_filename)
+    file_handler = logging.handlers.RotatingFileHandler(log_filename, maxBytes=50 << 20, backupCount=5)
     file_handler.setLevel(logging.INFO)
     file_handler.setFormatter(formatter)
-    
-    # Create console handler with a higher log level
+
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(formatter)
-    
-    # Add handlers to logger if they don't exist already
-    if not logger.handlers:
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
-    
-    return logger 
\ No newline at end of file
+
+    log_queue = SimpleQueue()
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.INFO)
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    _queue_listener = logging.handlers.QueueListener(
+        log_queue, file_handler, console_handler, respect_handler_level=True
+    )
+    _queue_listener.start()
+    atexit.register(_queue_listener.stop)
+
+def setup_logger(name):
+    """
+    Get a logger backed by the shared queue-based handlers
+    """
+    _configure_logging()
+    return logging.getLogger(name)
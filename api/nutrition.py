@@ -1,14 +1,55 @@
 import os
 import re
-from qdrant_client import QdrantClient
-from openai import OpenAI
-from api.embedding_utils import get_embedding_model
+import asyncio
+from functools import lru_cache
+import httpx
+import orjson
+from openai import AsyncOpenAI
+from qdrant_client.models import SearchParams
+from api.embedding_utils import encode_one_cached
+from api.qdrant_utils import get_qdrant, ensure_collection
+from api.semantic_cache import SemanticCache
 from api.logging_utils import setup_logger
 
 logger = setup_logger(__name__)
 
 COLLECTION_NAME = "nutrition_data"
 
+# Keywords that introduce a geographic region in the query
+_REGION_KEYWORDS = ("region", "state", "city", "district", "area", "from", "lives in")
+
+@lru_cache(maxsize=1)
+def get_llama_client():
+    """
+    Get or create the shared LLM client; one HTTP/2 connection pool with
+    keep-alive avoids a fresh TCP+TLS handshake per request
+    """
+    return AsyncOpenAI(
+        base_url=os.getenv("E2E_NETWORKS_URL"),
+        api_key=os.getenv("LLAMA_API_KEY"),
+        http_client=httpx.AsyncClient(http2=True, limits=httpx.Limits(max_keepalive_connections=20))
+    )
+
+# Cache of recent retrieval results keyed by query embedding
+_retrieval_cache = SemanticCache()
+
+# Precompiled patterns for recovering structure from LLM responses
+_JSON_RE = re.compile(r'```json\s*(.*?)\s*```|```\s*(.*?)\s*```|(\{.*\})', re.DOTALL)
+
+_DAY_RES = [
+    re.compile(r'Day (\d+)[:\s]*(.*?)(?=Day \d+|$)', re.DOTALL | re.IGNORECASE),
+    re.compile(r'day(\d+)[:\s]*(.*?)(?=day\d+|$)', re.DOTALL | re.IGNORECASE),
+    re.compile(r'DAY (\d+)[:\s]*(.*?)(?=DAY \d+|$)', re.DOTALL | re.IGNORECASE)
+]
+
+_MEAL_RES = {
+    "breakfast": re.compile(r'breakfast[:\s]*(.*?)(?=lunch|dinner|snack|$)', re.DOTALL | re.IGNORECASE),
+    "morning_snack": re.compile(r'morning snack[:\s]*(.*?)(?=lunch|dinner|breakfast|evening|$)', re.DOTALL | re.IGNORECASE),
+    "lunch": re.compile(r'lunch[:\s]*(.*?)(?=breakfast|dinner|snack|$)', re.DOTALL | re.IGNORECASE),
+    "evening_snack": re.compile(r'evening snack[:\s]*(.*?)(?=breakfast|lunch|dinner|morning|$)', re.DOTALL | re.IGNORECASE),
+    "dinner": re.compile(r'dinner[:\s]*(.*?)(?=breakfast|lunch|snack|$)', re.DOTALL | re.IGNORECASE)
+}
+
 async def get_nutrition_recommendation(query: str, limit: int = 3):
     """
     Get nutrition recommendations for pregnant women based on their details
@@ -17,50 +58,60 @@ async def get_nutrition_recommendation(query: str, limit: int = 3):
     logger.info(f"Getting nutrition recommendation for query: '{query}', limit: {limit}")
     
     try:
-        qdrant_url = os.getenv("QDRANT_URL")
-        qdrant_api_key = os.getenv("QDRANT_API_KEY")
         llama_api_key = os.getenv("LLAMA_API_KEY")
         e2e_networks_url = os.getenv("E2E_NETWORKS_URL")
-        
-        if not qdrant_url or not qdrant_api_key or not llama_api_key or not e2e_networks_url:
+
+        if not llama_api_key or not e2e_networks_url:
             logger.error("Missing required environment variables")
             raise ValueError("Missing required environment variables")
-        
-        client = QdrantClient(url=qdrant_url, api_key=qdrant_api_key)
-        
-        collections = client.get_collections().collections
-        collection_exists = any(collection.name == COLLECTION_NAME for collection in collections)
-        
-        if not collection_exists:
+
+        client = get_qdrant()
+
+        # The collection check and the query encode are independent, so run
+        # them concurrently instead of back to back
+        async with asyncio.TaskGroup() as tg:
+            encode_task = tg.create_task(asyncio.to_thread(encode_one_cached, query))
+            collection_task = tg.create_task(asyncio.to_thread(ensure_collection, COLLECTION_NAME))
+
+        if not collection_task.result():
             logger.error(f"Collection {COLLECTION_NAME} does not exist")
             raise ValueError(f"Collection {COLLECTION_NAME} does not exist")
-        
-        model = get_embedding_model()
-        query_vector = model.encode([query])[0]
-        
-        results = client.search(
-            collection_name=COLLECTION_NAME,
-            query_vector=query_vector,
-            limit=limit
-        )
-        
-        nutrition_info = [res.payload.get("text", "") for res in results]
+
+        query_vector = encode_task.result()
+
+        cache_key = f"{COLLECTION_NAME}:{limit}"
+        nutrition_info = _retrieval_cache.get(cache_key, query_vector)
+
+        if nutrition_info is None:
+            results = await asyncio.to_thread(
+                client.search,
+                collection_name=COLLECTION_NAME,
+                query_vector=query_vector.tolist(),
+                limit=limit,
+                with_payload=["text"],
+                with_vectors=False,
+                search_params=SearchParams(hnsw_ef=int(os.getenv("QDRANT_HNSW_EF", "64")), exact=False)
+            )
+
+            nutrition_info = [res.payload.get("text", "") for res in results]
+            _retrieval_cache.put(cache_key, query_vector, nutrition_info)
+
         combined_info = "\n\n".join(nutrition_info)
         
-        region_keywords = ["region", "state", "city", "district", "area", "from", "lives in"]
+        # Take up to two words after the first region keyword found,
+        # lowercasing and scanning the query only once
+        query_lower = query.lower()
         region = "unknown"
-        
-        for keyword in region_keywords:
-            if keyword in query.lower():
-                parts = query.lower().split(keyword)
-                if len(parts) > 1:
-                    region_part = parts[1].strip()
-                    region_words = region_part.split()
-                    if len(region_words) > 0:
-                        region = region_words[0]
-                        if len(region_words) > 1:
-                            region += " " + region_words[1]
-                        break
+
+        for keyword in _REGION_KEYWORDS:
+            idx = query_lower.find(keyword)
+            if idx != -1:
+                tail = query_lower[idx + len(keyword):].split(maxsplit=2)
+                if tail:
+                    region = tail[0]
+                    if len(tail) > 1:
+                        region += " " + tail[1]
+                    break
         
         prompt = f"""
 You are a nutrition expert specializing in maternal health. Based on the following information about a pregnant woman and nutritional guidelines, create a personalized 7-day diet plan.
@@ -88,13 +139,10 @@ Your response should be in a structured JSON format with the following structure
 Make sure your response is valid JSON that can be parsed directly.
 """
         
-        llama_client = OpenAI(
-            base_url=e2e_networks_url,
-            api_key=llama_api_key
-        )
-        
+        llama_client = get_llama_client()
+
         try:
-            completion = llama_client.chat.completions.create(
+            completion = await llama_client.chat.completions.create(
                 model='llama3_2_3b_instruct',
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.5,
@@ -106,9 +154,8 @@ Make sure your response is valid JSON that can be parsed directly.
             
             diet_plan_text = completion.choices[0].message.content
             
-            json_pattern = r'```json\s*(.*?)\s*```|```\s*(.*?)\s*```|(\{.*\})'
-            json_match = re.search(json_pattern, diet_plan_text, re.DOTALL)
-            
+            json_match = _JSON_RE.search(diet_plan_text)
+
             if json_match:
                 for group in json_match.groups():
                     if group:
@@ -117,18 +164,19 @@ Make sure your response is valid JSON that can be parsed directly.
             
             diet_plan_text = diet_plan_text.strip()
             if not diet_plan_text.startswith('{'):
-                start_idx = diet_plan_text.find('{')
-                if start_idx != -1:
-                    diet_plan_text = diet_plan_text[start_idx:]
-            
+                try:
+                    diet_plan_text = diet_plan_text[diet_plan_text.index('{'):]
+                except ValueError:
+                    pass
+
             if not diet_plan_text.endswith('}'):
-                end_idx = diet_plan_text.rfind('}')
-                if end_idx != -1:
-                    diet_plan_text = diet_plan_text[:end_idx+1]
-            
-            import json
+                try:
+                    diet_plan_text = diet_plan_text[:diet_plan_text.rindex('}') + 1]
+                except ValueError:
+                    pass
+
             try:
-                diet_plan_json = json.loads(diet_plan_text)
+                diet_plan_json = orjson.loads(diet_plan_text)
                 
                 structured_response = {}
                 
@@ -158,19 +206,13 @@ Make sure your response is valid JSON that can be parsed directly.
                     "region": region
                 }
                 
-            except json.JSONDecodeError as e:
+            except orjson.JSONDecodeError as e:
                 logger.error(f"Failed to parse diet plan as JSON: {str(e)}")
                 
                 structured_response = {}
-                
-                day_patterns = [
-                    r'Day (\d+)[:\s]*(.*?)(?=Day \d+|$)',
-                    r'day(\d+)[:\s]*(.*?)(?=day\d+|$)',
-                    r'DAY (\d+)[:\s]*(.*?)(?=DAY \d+|$)'
-                ]
-                
-                for pattern in day_patterns:
-                    day_matches = re.findall(pattern, diet_plan_text, re.DOTALL | re.IGNORECASE)
+
+                for pattern in _DAY_RES:
+                    day_matches = pattern.findall(diet_plan_text)
                     if day_matches:
                         for day_num, day_content in day_matches:
                             day_key = f"day{day_num}"
@@ -182,16 +224,8 @@ Make sure your response is valid JSON that can be parsed directly.
                                 "dinner": "Not specified"
                             }
                             
-                            meal_patterns = {
-                                "breakfast": r'breakfast[:\s]*(.*?)(?=lunch|dinner|snack|$)',
-                                "morning_snack": r'morning snack[:\s]*(.*?)(?=lunch|dinner|breakfast|evening|$)',
-                                "lunch": r'lunch[:\s]*(.*?)(?=breakfast|dinner|snack|$)',
-                                "evening_snack": r'evening snack[:\s]*(.*?)(?=breakfast|lunch|dinner|morning|$)',
-                                "dinner": r'dinner[:\s]*(.*?)(?=breakfast|lunch|snack|$)'
-                            }
-                            
-                            for meal_key, meal_pattern in meal_patterns.items():
-                                meal_match = re.search(meal_pattern, day_content, re.DOTALL | re.IGNORECASE)
+                            for meal_key, meal_pattern in _MEAL_RES.items():
+                                meal_match = meal_pattern.search(day_content)
                                 if meal_match:
                                     day_data[meal_key] = meal_match.group(1).strip()
                             
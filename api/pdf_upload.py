@@ -1,12 +1,13 @@
 import os
-import uuid
+import time
+import asyncio
 import tempfile
 from fastapi import UploadFile
-from qdrant_client import QdrantClient
 from qdrant_client.models import VectorParams, Distance, PointStruct
 from langchain.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from api.embedding_utils import get_embedding_model
+from api.qdrant_utils import get_qdrant, ensure_collection, register_collection
 from api.logging_utils import setup_logger
 
 # Set up logger
@@ -19,44 +20,34 @@ async def process_pdf(file: UploadFile, collection_name: str):
     logger.info(f"Processing PDF file: {file.filename}, collection: {collection_name}")
     
     try:
-        # Load environment variables
-        qdrant_url = os.getenv("QDRANT_URL")
-        qdrant_api_key = os.getenv("QDRANT_API_KEY")
-        
-        if not qdrant_url or not qdrant_api_key:
-            logger.error("Qdrant URL or API key not found in environment variables")
-            raise ValueError("Qdrant URL or API key not found in environment variables")
-        
         chunk_size = int(os.getenv("CHUNK_SIZE", "500"))
         chunk_overlap = int(os.getenv("CHUNK_OVERLAP", "100"))
         
         logger.info(f"Using chunk size: {chunk_size}, chunk overlap: {chunk_overlap}")
         
-        # Initialize Qdrant client
-        logger.info(f"Connecting to Qdrant at {qdrant_url}")
-        client = QdrantClient(url=qdrant_url, api_key=qdrant_api_key)
-        
+        # Get the shared Qdrant client
+        client = get_qdrant()
+
         # Check if collection exists, if not create it
         logger.info(f"Checking if collection {collection_name} exists")
-        collections = client.get_collections().collections
-        collection_exists = any(collection.name == collection_name for collection in collections)
-        
-        if not collection_exists:
+        if not ensure_collection(collection_name):
             logger.info(f"Creating new collection: {collection_name}")
             client.create_collection(
                 collection_name=collection_name,
                 vectors_config=VectorParams(size=384, distance=Distance.COSINE),
             )
+            register_collection(collection_name)
         
         # Get the embedding model
         logger.info("Loading embedding model")
         model = get_embedding_model()
         
-        # Save the uploaded file to a temporary location
+        # Stream the uploaded file to a temporary location in 1 MiB chunks
+        # so the whole PDF is never held in memory at once
         logger.info("Saving uploaded file to temporary location")
         with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
-            content = await file.read()
-            temp_file.write(content)
+            while chunk := await file.read(1 << 20):
+                temp_file.write(chunk)
             temp_file_path = temp_file.name
             logger.info(f"Temporary file saved at: {temp_file_path}")
         
@@ -96,18 +87,24 @@ async def process_pdf(file: UploadFile, collection_name: str):
             
             logger.info(f"Created {len(chunks)} text chunks")
             
-            # Generate embeddings for each chunk
+            # Generate embeddings, encoding each distinct text only once:
+            # repeated boilerplate (headers, footers) is common in PDFs
             logger.info("Generating embeddings for chunks")
-            texts = [chunk["text"] for chunk in chunks]
-            embeddings = model.encode(texts)
-            logger.info(f"Generated {len(embeddings)} embeddings")
+            unique_texts = list(dict.fromkeys(chunk["text"] for chunk in chunks))
+            unique_embeddings = await asyncio.to_thread(model.encode, unique_texts)
+            vector_of = dict(zip(unique_texts, unique_embeddings))
+            embeddings = [vector_of[chunk["text"]] for chunk in chunks]
+            logger.info(f"Generated {len(unique_embeddings)} embeddings for {len(chunks)} chunks")
             
-            # Create points for Qdrant
+            # Create points for Qdrant with monotonic integer IDs; a single
+            # nanosecond-timestamp seed keeps them unique across uploads
+            # without the per-point cost of uuid4
             logger.info("Creating points for Qdrant")
+            base_id = time.time_ns()
             points = [
                 PointStruct(
-                    id=str(uuid.uuid4()),
-                    vector=embeddings[i],
+                    id=base_id + i,
+                    vector=embeddings[i].tolist(),
                     payload={
                         "text": chunks[i]["text"],
                         "source": chunks[i]["source"],
@@ -118,9 +115,14 @@ async def process_pdf(file: UploadFile, collection_name: str):
                 for i in range(len(chunks))
             ]
             
-            # Upload to Qdrant
+            # Upload to Qdrant in parallel batches; wait=False lets the
+            # server acknowledge without blocking on indexing
             logger.info(f"Uploading {len(points)} points to Qdrant collection {collection_name}")
-            client.upsert(collection_name=collection_name, points=points)
+            batches = [points[i:i+128] for i in range(0, len(points), 128)]
+            await asyncio.gather(*[
+                asyncio.to_thread(client.upsert, collection_name=collection_name, points=batch, wait=False)
+                for batch in batches
+            ])
             
             logger.info(f"Successfully processed and uploaded {file.filename}")
             return {
@@ -0,0 +1,50 @@
+import os
+from functools import lru_cache
+from qdrant_client import QdrantClient
+from api.logging_utils import setup_logger
+
+# Set up logger
+logger = setup_logger(__name__)
+
+# Cache of collection names known to exist, refreshed lazily on miss
+_known_collections = None
+
+@lru_cache(maxsize=1)
+def get_qdrant():
+    """
+    Get or create the process-wide Qdrant client instance
+    """
+    qdrant_url = os.getenv("QDRANT_URL")
+    qdrant_api_key = os.getenv("QDRANT_API_KEY")
+
+    if not qdrant_url or not qdrant_api_key:
+        logger.error("Qdrant URL or API key not found in environment variables")
+        raise ValueError("Qdrant URL or API key not found in environment variables")
+
+    logger.info(f"Connecting to Qdrant at {qdrant_url}")
+    return QdrantClient(url=qdrant_url, api_key=qdrant_api_key, prefer_grpc=True, timeout=10)
+
+def ensure_collection(collection_name):
+    """
+    Check whether a collection exists, using the cached collection names
+    and only re-fetching from the server on a miss
+    """
+    global _known_collections
+    try:
+        if _known_collections is None or collection_name not in _known_collections:
+            logger.info(f"Refreshing collection list from Qdrant")
+            collections = get_qdrant().get_collections().collections
+            _known_collections = {collection.name for collection in collections}
+        return collection_name in _known_collections
+    except Exception as e:
+        logger.error(f"Error checking collection {collection_name}: {str(e)}")
+        raise
+
+def register_collection(collection_name):
+    """
+    Record a newly created collection in the cached collection names
+    """
+    global _known_collections
+    if _known_collections is None:
+        _known_collections = set()
+    _known_collections.add(collection_name)
@@ -1,11 +1,33 @@
 import os
 import re
-from qdrant_client import QdrantClient
-from api.embedding_utils import get_embedding_model
+import asyncio
+from qdrant_client.models import SearchParams
+from api.embedding_utils import encode_one_cached
+from api.qdrant_utils import get_qdrant, ensure_collection
+from api.semantic_cache import SemanticCache
 from api.logging_utils import setup_logger
 
 logger = setup_logger(__name__)
 
+# Cache of recent search results keyed by query embedding
+_results_cache = SemanticCache()
+
+# Single compiled alternation so one scan of the content extracts every field
+_SCHEME_RE = re.compile(
+    r"(?P<key>State|Description|Eligibility|How to Apply|Benefits|Documents Required|Contact):\s*(?P<value>[^\n]+)",
+    re.IGNORECASE
+)
+
+_KEY_MAP = {
+    "state": "state",
+    "description": "description",
+    "eligibility": "eligibility",
+    "how to apply": "how_to_apply",
+    "benefits": "benefits",
+    "documents required": "documents_required",
+    "contact": "contact_info"
+}
+
 async def semantic_search(query: str, collection_name: str, limit: int = 3):
     """
     Perform semantic search on stored PDF content
@@ -13,29 +35,39 @@ async def semantic_search(query: str, collection_name: str, limit: int = 3):
     logger.info(f"Performing semantic search with query: '{query}', collection: {collection_name}, limit: {limit}")
     
     try:
-        qdrant_url = os.getenv("QDRANT_URL")
-        qdrant_api_key = os.getenv("QDRANT_API_KEY")
-        
-        if not qdrant_url or not qdrant_api_key:
-            logger.error("Qdrant URL or API key not found in environment variables")
-            raise ValueError("Qdrant URL or API key not found in environment variables")
-        
-        client = QdrantClient(url=qdrant_url, api_key=qdrant_api_key)
-        
-        collections = client.get_collections().collections
-        collection_exists = any(collection.name == collection_name for collection in collections)
-        
-        if not collection_exists:
+        client = get_qdrant()
+
+        # The collection check and the query encode are independent, so run
+        # them concurrently instead of back to back
+        async with asyncio.TaskGroup() as tg:
+            encode_task = tg.create_task(asyncio.to_thread(encode_one_cached, query))
+            collection_task = tg.create_task(asyncio.to_thread(ensure_collection, collection_name))
+
+        if not collection_task.result():
             logger.error(f"Collection {collection_name} does not exist")
             raise ValueError(f"Collection {collection_name} does not exist")
-        
-        model = get_embedding_model()
-        query_vector = model.encode([query])[0]
-        
-        results = client.search(
+
+        query_vector = encode_task.result()
+
+        cache_key = f"{collection_name}:{limit}"
+        cached_results = _results_cache.get(cache_key, query_vector)
+        if cached_results is not None:
+            logger.info("Returning semantically cached search results")
+            return {
+                "results": cached_results
+            }
+
+        # Only the text payload is consumed downstream; skipping vectors and
+        # unused fields shrinks the response, and a modest hnsw_ef cuts
+        # server-side work
+        results = await asyncio.to_thread(
+            client.search,
             collection_name=collection_name,
-            query_vector=query_vector,
-            limit=limit
+            query_vector=query_vector.tolist(),
+            limit=limit,
+            with_payload=["text"],
+            with_vectors=False,
+            search_params=SearchParams(hnsw_ef=int(os.getenv("QDRANT_HNSW_EF", "64")), exact=False)
         )
         
         logger.info(f"Found {len(results)} results")
@@ -46,7 +78,9 @@ async def semantic_search(query: str, collection_name: str, limit: int = 3):
             structured_data = parse_health_scheme(content)
             structured_data["result_id"] = i + 1
             formatted_results.append(structured_data)
-        
+
+        _results_cache.put(cache_key, query_vector, formatted_results)
+
         logger.info("Search completed successfully")
         return {
             "results": formatted_results
@@ -71,24 +105,12 @@ def parse_health_scheme(content):
         "contact_info": ""
     }
     
-    lines = content.strip().split('\n')
-    if lines:
-        structured_data["scheme_name"] = lines[0].strip()
-    
-    patterns = {
-        "state": r"State:\s*([^\n]+)",
-        "description": r"Description:\s*([^\n]+)",
-        "eligibility": r"Eligibility:\s*([^\n]+)",
-        "how_to_apply": r"How to Apply:\s*([^\n]+)",
-        "benefits": r"Benefits:\s*([^\n]+)",
-        "documents_required": r"Documents Required:\s*([^\n]+)",
-        "contact_info": r"Contact:\s*([^\n]+)"
-    }
-    
-    for key, pattern in patterns.items():
-        match = re.search(pattern, content, re.IGNORECASE)
-        if match:
-            structured_data[key] = match.group(1).strip()
+    structured_data["scheme_name"] = content.strip().partition('\n')[0].strip()
+
+    for match in _SCHEME_RE.finditer(content):
+        key = _KEY_MAP[match.group("key").lower()]
+        if not structured_data[key]:
+            structured_data[key] = match.group("value").strip()
     
     if all(value == "" for key, value in structured_data.items() if key != "scheme_name" and key != "result_id"):
         structured_data["raw_content"] = content
@@ -0,0 +1,71 @@
+import time
+import numpy as np
+from api.logging_utils import setup_logger
+
+# Set up logger
+logger = setup_logger(__name__)
+
+class SemanticCache:
+    """
+    Small semantic cache keyed by query embedding: a query reuses the
+    results of a previous query whose vector is nearly identical
+    (cosine similarity above the threshold), within a TTL
+    """
+    def __init__(self, threshold=0.98, ttl=300, maxsize=256):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._vectors = None
+        self._entries = []
+
+    def get(self, namespace, query_vector):
+        """
+        Return cached results for a semantically matching query, or None
+        """
+        try:
+            self._evict_expired()
+            rows = [i for i, entry in enumerate(self._entries) if entry[0] == namespace]
+            if not rows:
+                return None
+
+            query_vector = np.asarray(query_vector, dtype=np.float32)
+            similarities = self._vectors[rows] @ query_vector
+            best = int(np.argmax(similarities))
+
+            if similarities[best] >= self.threshold:
+                logger.info(f"Semantic cache hit (similarity: {similarities[best]:.4f})")
+                return self._entries[rows[best]][1]
+            return None
+        except Exception as e:
+            logger.error(f"Error reading semantic cache: {str(e)}")
+            return None
+
+    def put(self, namespace, query_vector, results):
+        """
+        Store results for a query vector
+        """
+        try:
+            query_vector = np.asarray(query_vector, dtype=np.float32).reshape(1, -1)
+            if self._vectors is None:
+                self._vectors = query_vector
+            else:
+                self._vectors = np.vstack([self._vectors, query_vector])
+            self._entries.append((namespace, results, time.monotonic()))
+
+            if len(self._entries) > self.maxsize:
+                self._vectors = self._vectors[-self.maxsize:]
+                self._entries = self._entries[-self.maxsize:]
+        except Exception as e:
+            logger.error(f"Error writing semantic cache: {str(e)}")
+
+    def _evict_expired(self):
+        """
+        Drop entries older than the TTL
+        """
+        if not self._entries:
+            return
+        cutoff = time.monotonic() - self.ttl
+        keep = [i for i, entry in enumerate(self._entries) if entry[2] >= cutoff]
+        if len(keep) != len(self._entries):
+            self._entries = [self._entries[i] for i in keep]
+            self._vectors = self._vectors[keep] if keep else None
@@ -1,63 +1,141 @@
 import os
-import torch
-from transformers import AutoTokenizer, AutoModel
+
+# Use the Rust hf_transfer backend for parallel byte-range downloads;
+# must be set before huggingface_hub is imported, and only when the
+# package is actually installed (the hub errors rather than falls back)
+try:
+    import hf_transfer  # noqa: F401
+    os.environ.setdefault("HF_HUB_ENABLE_HF_TRANSFER", "1")
+except ImportError:
+    pass
+
 import logging
+from functools import lru_cache
 
-# Configure logging
+# Configure console logging; the file handler is attached lazily inside
+# download_model() so importing this module never touches the log file
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler("download_model.log")
-    ]
+    format='%(levelname)s %(message)s'
 )
 
 logger = logging.getLogger(__name__)
 
+def _pooled_session():
+    """
+    Build a requests session with a larger keep-alive pool so the many
+    small tokenizer/config fetches reuse connections instead of
+    re-handshaking
+    """
+    import requests
+
+    session = requests.Session()
+    session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=32))
+    return session
+
+def _has_nonzero_file(local_model_dir, names):
+    """
+    Check whether any of the named files exists with nonzero size
+    """
+    for name in names:
+        path = os.path.join(local_model_dir, name)
+        if os.path.isfile(path) and os.path.getsize(path) > 0:
+            return True
+    return False
+
+def _snapshot_complete(local_model_dir):
+    """
+    Check whether the local directory already holds a usable model snapshot:
+    config, weights, and tokenizer must all be present, since a download
+    interrupted mid-way (files are fetched in parallel) can leave any
+    subset behind
+    """
+    if not os.path.isfile(os.path.join(local_model_dir, "config.json")):
+        return False
+    if not _has_nonzero_file(local_model_dir, ("model.safetensors", "pytorch_model.bin")):
+        return False
+    return _has_nonzero_file(local_model_dir, ("tokenizer.json", "vocab.txt"))
+
+@lru_cache(maxsize=1)
 def download_model():
     """
-    Download and save the sentence transformer model locally
+    Download and save the sentence transformer model locally, returning
+    the model directory; memoized so repeat calls from app restarts or
+    worker spawns skip even the filesystem checks (failures raise and are
+    not cached)
+
+    Weights are stored at published FP32 precision; INT8 happens at load
+    time via dynamic quantization in api.embedding_utils, which keeps a
+    single PyTorch inference stack and the on-disk snapshot canonical
     """
+    # Imported here so `import download_model` stays cheap for tests and
+    # tooling that never trigger a download
+    from huggingface_hub import snapshot_download, configure_http_backend
+
     try:
-        model_name = "sentence-transformers/all-MiniLM-L6-v2"
-        local_model_dir = os.path.join("models", "all-MiniLM-L6-v2")
-        
+        # delay=True defers opening download_model.log until the first emit
+        if not logger.handlers:
+            file_handler = logging.FileHandler("download_model.log", delay=True)
+            file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+            logger.addHandler(file_handler)
+
+        # Model id, revision, and target directory are env-overridable;
+        # pinning MODEL_REVISION to a commit sha makes cache hits
+        # reproducible across CI runs
+        model_name = os.getenv("MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+        model_revision = os.getenv("MODEL_REVISION")
+        local_model_dir = os.getenv("LOCAL_MODEL_DIR", os.path.join("models", "all-MiniLM-L6-v2"))
+
+        # Short-circuit when a complete snapshot is already on disk
+        if _snapshot_complete(local_model_dir):
+            logger.info("Model already present at %s, skipping download", local_model_dir)
+            return local_model_dir
+
         # Create the models directory if it doesn't exist
         os.makedirs(local_model_dir, exist_ok=True)
-        logger.info(f"Created model directory: {local_model_dir}")
+        logger.info("Created model directory: %s", local_model_dir)
         
-        logger.info(f"Downloading model {model_name}...")
-        
-        try:
-            # Download and save the tokenizer
-            logger.info("Downloading tokenizer...")
-            tokenizer = AutoTokenizer.from_pretrained(model_name, cache_dir=local_model_dir)
-            tokenizer.save_pretrained(local_model_dir)
-            logger.info("Tokenizer downloaded and saved successfully")
-            
-            # Download and save the model
-            logger.info("Downloading model...")
-            model = AutoModel.from_pretrained(model_name, cache_dir=local_model_dir)
-            model.save_pretrained(local_model_dir)
-            logger.info("Model downloaded and saved successfully")
-            
-            logger.info(f"Model saved to {local_model_dir}")
-            return True
-        except Exception as e:
-            logger.error(f"Error downloading model: {str(e)}")
-            raise
-    except Exception as e:
-        logger.error(f"Unexpected error in download_model: {str(e)}")
-        return False
+        logger.info("Downloading model %s...", model_name)
+
+        # Route hub HTTP traffic through the pooled session
+        configure_http_backend(backend_factory=_pooled_session)
+
+        # Stream the published files straight into the target directory;
+        # only the safetensors weights are fetched so the pickle-format
+        # pytorch_model.bin is never downloaded or deserialized. Because
+        # no nn.Module is ever built here, the script's peak RSS stays
+        # flat instead of holding the full parameter tensors in memory.
+        # cache_dir is deliberately not passed: the hub's default
+        # resolution honors HF_HOME / HUGGINGFACE_HUB_CACHE, so shared
+        # caches (CI, NFS) are reused instead of re-downloading.
+        # Interrupted transfers resume from the .incomplete file via
+        # HTTP Range requests (always on in current huggingface_hub;
+        # the old resume_download flag is deprecated), and hf_transfer
+        # adds parallel range GETs within each file
+        snapshot_download(
+            repo_id=model_name,
+            revision=model_revision,
+            local_dir=local_model_dir,
+            allow_patterns=["*.safetensors", "*.json", "*.txt", "tokenizer*", "vocab*"],
+            max_workers=int(os.getenv("HF_DOWNLOAD_WORKERS", "8"))
+        )
+
+        # The hub already validates each file against its etag/sha256
+        # through .incomplete temp files and resumes only what failed;
+        # this final check just guards against an unexpected layout
+        if not _snapshot_complete(local_model_dir):
+            raise RuntimeError(f"Downloaded snapshot at {local_model_dir} is incomplete")
+
+        logger.info("Model saved to %s", local_model_dir)
+        return local_model_dir
+    except Exception:
+        logger.exception("Error downloading model")
+        raise
 
 if __name__ == "__main__":
     try:
         logger.info("Starting model download process")
-        success = download_model()
-        if success:
-            logger.info("Model download completed successfully")
-        else:
-            logger.error("Model download failed")
-    except Exception as e:
-        logger.error(f"Unhandled exception: {str(e)}") 
\ No newline at end of file
+        download_model()
+        logger.info("Model download completed successfully")
+    except Exception:
+        logger.error("Model download failed")
\ No newline at end of file